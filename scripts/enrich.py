@@ -6,15 +6,117 @@ Conservative approach: only updates fields when there's strong signal from
 multiple sources (tags, name, description, repository URL, framework).
 """
 
+import hashlib
 import json
-import glob
 import os
 import re
+import sys
+import threading
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, partial
 from pathlib import Path
+from typing import Callable
+
+try:
+    import orjson
+except ImportError:  # optional speedup; falls back to the stdlib json module
+    orjson = None
+
+try:
+    import hyperscan
+except ImportError:  # optional speedup; pattern batteries fall back to re
+    hyperscan = None
 
 AGENTS_DIR = Path(__file__).parent.parent / "src" / "data" / "agents"
 
+# Inference results from previous runs, keyed by a hash of each agent's inputs
+CACHE_FILE = Path(__file__).parent / ".enrich_cache.json"
+# Any edit to this script (rules, patterns, weights) invalidates the cache
+CACHE_VERSION = hashlib.sha1(Path(__file__).read_bytes()).hexdigest()
+
+
+# ============================================================
+# Pattern matching helpers
+# ============================================================
+
+# Pattern tables are kept as source strings and compiled on first use by the
+# @cache accessors next to each table, so runs where every agent is already
+# enriched (or cached) never pay for compiling them
+
+def _compile_patterns(patterns: list[tuple[str, str]], flags: int = 0) -> list[tuple[re.Pattern, str]]:
+    """Compile (regex, value) pairs."""
+    return [(re.compile(pattern, flags), value) for pattern, value in patterns]
+
+
+def _compile_hyperscan(patterns: list[tuple[re.Pattern, str]]):
+    """Compile a pattern battery into one Hyperscan database, or None if unavailable.
+
+    Patterns are compiled in prefilter mode, since Hyperscan lacks some
+    constructs used here (e.g. lookahead); hits must be confirmed with re.
+    """
+    if hyperscan is None:
+        return None
+    base = hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP | hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_PREFILTER
+    db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+    try:
+        db.compile(
+            expressions=[pattern.pattern.encode("utf-8") for pattern, _ in patterns],
+            ids=list(range(len(patterns))),
+            flags=[
+                base | hyperscan.HS_FLAG_CASELESS if pattern.flags & re.IGNORECASE else base
+                for pattern, _ in patterns
+            ],
+        )
+    except hyperscan.error:
+        return None
+    return db
+
+
+def top_candidates(candidates: dict[str, int]) -> tuple[str | None, int, int]:
+    """Return (best, best score, runner-up score) in a single pass.
+
+    Ties go to the candidate scored first; scores default to 0 when there
+    are fewer than two candidates.
+    """
+    best = None
+    best_score = 0
+    runner_up_score = 0
+    for candidate, score in candidates.items():
+        if score > best_score:
+            runner_up_score = best_score
+            best, best_score = candidate, score
+        elif score > runner_up_score:
+            runner_up_score = score
+    return best, best_score, runner_up_score
+
+
+# Hyperscan scratch space can't be shared between threads
+_hyperscan_local = threading.local()
+
+
+def _on_hyperscan_match(pattern_id, _start, _end, _flags, hits):
+    hits.add(pattern_id)
+
+
+def match_battery(patterns: list[tuple[re.Pattern, str]], db, text: str) -> list[int]:
+    """Return the indices of the patterns in a battery that match text, in battery order."""
+    if db is None:
+        return [i for i, (pattern, _) in enumerate(patterns) if pattern.search(text)]
+
+    scratches = getattr(_hyperscan_local, "scratches", None)
+    if scratches is None:
+        scratches = _hyperscan_local.scratches = {}
+    scratch = scratches.get(db)
+    if scratch is None:
+        scratch = scratches[db] = hyperscan.Scratch(db)
+
+    hits = set()
+    db.scan(text.encode("utf-8"), match_event_handler=_on_hyperscan_match, context=hits, scratch=scratch)
+    # Prefilter mode may over-report, never under-report; confirm with re
+    return [i for i in sorted(hits) if patterns[i][0].search(text)]
+
+
 # ============================================================
 # Language inference
 # ============================================================
@@ -160,6 +262,9 @@ REPO_SUFFIX_LANGUAGE = {
     "-lua": "lua",
 }
 
+# Longest first, so the first suffix that matches is the most specific one
+_REPO_SUFFIXES = tuple(sorted(REPO_SUFFIX_LANGUAGE, key=len, reverse=True))
+
 # Description keywords for language (need word boundary matching)
 DESC_LANGUAGE_PATTERNS = [
     (r'\bPython\b', "python"),
@@ -184,6 +289,28 @@ DESC_LANGUAGE_PATTERNS = [
     (r'\bZig\b', "zig"),
 ]
 
+
+@cache
+def desc_language_patterns() -> list[tuple[re.Pattern, str]]:
+    return _compile_patterns(DESC_LANGUAGE_PATTERNS)
+
+
+@cache
+def _desc_language_db():
+    return _compile_hyperscan(desc_language_patterns())
+
+
+@cache
+def name_slug_language_patterns() -> list[tuple[re.Pattern, str]]:
+    return _compile_patterns(NAME_SLUG_LANGUAGE_PATTERNS)
+
+
+# "Official A2A <lang> sample ..." descriptions from the upstream samples repo
+@cache
+def official_sample_re() -> re.Pattern:
+    return re.compile(r'Official A2A (\w+) sample')
+
+
 # SDKs field as weak signal (only if single SDK listed and consistent)
 SDK_TO_LANGUAGE = {
     "python": "python",
@@ -196,20 +323,36 @@ SDK_TO_LANGUAGE = {
 }
 
 
-def infer_language(agent: dict) -> str | None:
-    """Infer language from available signals. Returns None if not confident."""
-    candidates = Counter()
+def infer_language(
+    agent: dict,
+    tag_languages: list[str],
+    slug_name_lc: str,
+    scan_desc: Callable[[], list[int]],
+) -> str | None:
+    """Infer language from available signals. Returns None if not confident.
+
+    tag_languages holds the TAG_TO_LANGUAGE value of each matching tag,
+    slug_name_lc the lowercased slug and name, and scan_desc returns the
+    DESC_LANGUAGE_PATTERNS indices matching the description (computed on
+    demand, since strong tag signals skip it).
+    """
+    candidates: dict[str, int] = {}
 
     # 1. Framework mapping (strong signal, weight=3)
     fw = agent.get("framework", "")
     if fw in FRAMEWORK_TO_LANGUAGE:
-        candidates[FRAMEWORK_TO_LANGUAGE[fw]] += 3
+        lang = FRAMEWORK_TO_LANGUAGE[fw]
+        candidates[lang] = candidates.get(lang, 0) + 3
 
     # 2. Tags (strong signal, weight=3)
-    for tag in agent.get("tags", []):
-        tag_lower = tag.lower()
-        if tag_lower in TAG_TO_LANGUAGE:
-            candidates[TAG_TO_LANGUAGE[tag_lower]] += 3
+    for lang in tag_languages:
+        candidates[lang] = candidates.get(lang, 0) + 3
+
+    # Framework and tags agree on a single language: the remaining sources
+    # can't realistically overturn that. Duplicate tags (e.g. "Python" and
+    # "python") count as one source here, so tags alone never short-circuit.
+    if fw in FRAMEWORK_TO_LANGUAGE and set(tag_languages) == {FRAMEWORK_TO_LANGUAGE[fw]}:
+        return FRAMEWORK_TO_LANGUAGE[fw]
 
     # 3. Repo URL suffix (strong signal, weight=3)
     repo = agent.get("repository", "")
@@ -219,51 +362,50 @@ def infer_language(agent: dict) -> str | None:
         # Find the actual repo name (typically index 4 in github URLs)
         if "github.com" in repo and len(repo_name) >= 5:
             actual_repo = repo_name[4].lower()
-            for suffix, lang in REPO_SUFFIX_LANGUAGE.items():
-                if actual_repo.endswith(suffix):
-                    candidates[lang] += 3
+            # Tuple endswith rejects the common no-suffix case without a Python loop
+            if actual_repo.endswith(_REPO_SUFFIXES):
+                for suffix in _REPO_SUFFIXES:
+                    if actual_repo.endswith(suffix):
+                        lang = REPO_SUFFIX_LANGUAGE[suffix]
+                        candidates[lang] = candidates.get(lang, 0) + 3
+                        break
 
     # 4. Slug / name patterns (medium signal, weight=2)
-    slug = agent.get("slug", "")
-    name = agent.get("name", "")
-    combined = f"{slug} {name}".lower()
-    for pattern, lang in NAME_SLUG_LANGUAGE_PATTERNS:
-        if re.search(pattern, combined):
-            candidates[lang] += 2
+    for pattern, lang in name_slug_language_patterns():
+        if pattern.search(slug_name_lc):
+            candidates[lang] = candidates.get(lang, 0) + 2
 
     # 5. Description patterns (medium signal, weight=2)
     desc = agent.get("description", "")
-    for pattern, lang in DESC_LANGUAGE_PATTERNS:
-        if re.search(pattern, desc):
-            candidates[lang] += 2
+    for i in scan_desc():
+        lang = DESC_LANGUAGE_PATTERNS[i][1]
+        candidates[lang] = candidates.get(lang, 0) + 2
 
     # 6. Official sample description pattern (strong signal)
     if desc.startswith("Official A2A"):
-        m = re.search(r'Official A2A (\w+) sample', desc)
+        m = official_sample_re().search(desc)
         if m:
             sample_lang = m.group(1).lower()
             if sample_lang in ("python", "java", "typescript", "go", "rust", "csharp", "kotlin"):
-                candidates[sample_lang] += 5
+                candidates[sample_lang] = candidates.get(sample_lang, 0) + 5
 
     # 7. SDKs field as weak tiebreaker (weight=1, only if single SDK)
     sdks = agent.get("sdks", [])
     if len(sdks) == 1 and sdks[0] in SDK_TO_LANGUAGE:
-        candidates[SDK_TO_LANGUAGE[sdks[0]]] += 1
+        lang = SDK_TO_LANGUAGE[sdks[0]]
+        candidates[lang] = candidates.get(lang, 0) + 1
 
-    if not candidates:
-        return None
+    best, best_score, runner_up_score = top_candidates(candidates)
 
     # Need minimum confidence score of 2 (at least one medium signal)
-    top = candidates.most_common(1)[0]
-    if top[1] < 2:
+    if best_score < 2:
         return None
 
     # If there's a tie at the top with very different languages, don't guess
-    top2 = candidates.most_common(2)
-    if len(top2) == 2 and top2[0][1] == top2[1][1]:
+    if runner_up_score == best_score:
         return None
 
-    return top[0]
+    return best
 
 
 # ============================================================
@@ -311,9 +453,38 @@ TAG_CATEGORY_RULES = [
     ({"real-estate", "property"}, "enterprise", 1),
 ]
 
-# Description keyword patterns for category
+
+def _build_tag_rule_index(rules: list[tuple[set[str], str, int]]) -> dict[str, list[int]]:
+    """Invert TAG_CATEGORY_RULES into tag → indices of the rules containing it."""
+    index: dict[str, list[int]] = {}
+    for i, (tag_set, _category, _min_matches) in enumerate(rules):
+        for tag in tag_set:
+            index.setdefault(tag, []).append(i)
+    return index
+
+
+# Inverted TAG_CATEGORY_RULES, so an agent only pays for the tags it actually has
+TAG_TO_CATEGORY_RULES = _build_tag_rule_index(TAG_CATEGORY_RULES)
+
+
+def match_tag_rules(tags: frozenset[str]) -> list[tuple[str, int]]:
+    """Return (category, matching tag count) for each satisfied rule, in rule order."""
+    hits: dict[int, int] = {}
+    for tag in tags:
+        for rule in TAG_TO_CATEGORY_RULES.get(tag, ()):
+            hits[rule] = hits.get(rule, 0) + 1
+    matched = []
+    for rule in sorted(hits):
+        _tag_set, category, min_matches = TAG_CATEGORY_RULES[rule]
+        if hits[rule] >= min_matches:
+            matched.append((category, hits[rule]))
+    return matched
+
+
+# Description keyword patterns for category.
+# Matched against the lowercased description, so they're written in lowercase.
 DESC_CATEGORY_PATTERNS = [
-    (r'\b(?:search|retriev|find|lookup|query|RAG)\b', "search"),
+    (r'\b(?:search|retriev|find|lookup|query|rag)\b', "search"),
     (r'\b(?:security|secur|authent|authoriz|encrypt|vulnerab|threat)\b', "security"),
     (r'\b(?:financ|bank|payment|trading|crypto|blockchain|escrow|defi)\b', "finance"),
     (r'\b(?:travel|flight|hotel|booking|trip|itinerary|tourism)\b', "travel"),
@@ -321,12 +492,12 @@ DESC_CATEGORY_PATTERNS = [
     (r'\b(?:code.*generat|generat.*code|coding|code review|program)\b', "code-generation"),
     (r'\b(?:data.*analy|analy.*data|visualization|dataset|analytics)\b', "data-analytics"),
     (r'\b(?:chatbot|conversational|dialog|conversation)\b', "conversational"),
-    (r'\b(?:deploy|docker|kubernetes|infra|DevOps|CI/CD)\b', "infrastructure"),
+    (r'\b(?:deploy|docker|kubernetes|infra|devops|ci/cd)\b', "infrastructure"),
     (r'\b(?:orchestrat|multi-agent|coordinat.*agent)\b', "orchestration"),
-    (r'\b(?:SDK|library|framework|implementation|toolkit|boilerplate|template|starter|wrapper)\b', "utility"),
-    (r'\b(?:[Ss]amples?|demo|example|tutorial|beginner|learning|101|playground|toy project|[Dd]ocs|documentation)\b', "utility"),
+    (r'\b(?:sdk|library|framework|implementation|toolkit|boilerplate|template|starter|wrapper)\b', "utility"),
+    (r'\b(?:samples?|demo|example|tutorial|beginner|learning|101|playground|toy project|docs|documentation)\b', "utility"),
     (r'(?:文档|教学|入门|示例)', "utility"),  # CJK: docs, tutorial, beginner, example
-    (r'\b(?:Agent Development Kit|ADK|SDK)\b', "utility"),
+    (r'\b(?:agent development kit|adk|sdk)\b', "utility"),
     (r'\b(?:protocol.*implementation|implementation.*protocol|protocol.*specification)\b', "utility"),
     (r'\b(?:testing|mocking|mock|test and interact)\b', "utility"),
     (r'\b(?:template|scaffold|boilerplate|starter)\b', "utility"),
@@ -338,6 +509,43 @@ DESC_CATEGORY_PATTERNS = [
     (r'\b(?:legal|lawyer|law\s+firm|attorney|contract.*review)\b', "enterprise"),
 ]
 
+
+@cache
+def desc_category_patterns() -> list[tuple[re.Pattern, str]]:
+    return _compile_patterns(DESC_CATEGORY_PATTERNS)
+
+
+@cache
+def _desc_category_db():
+    return _compile_hyperscan(desc_category_patterns())
+
+
+# Name/slug keyword patterns for category (weak signal, matched on lowercased text)
+NAME_CATEGORY_PATTERNS = [
+    (r'search|retriev|rag', "search"),
+    (r'secur|auth', "security"),
+    (r'financ|bank|trade|crypto', "finance"),
+    (r'travel|flight|hotel|trip', "travel"),
+    (r'media|image|video|audio', "media-content"),
+    (r'code|coding|dev', "code-generation"),
+    (r'data|analy', "data-analytics"),
+    (r'chat|convers', "conversational"),
+    (r'orchestrat|multi.?agent', "orchestration"),
+    (r'deploy|infra|devops|docker|k8s', "infrastructure"),
+]
+
+
+@cache
+def name_category_patterns() -> list[tuple[re.Pattern, str]]:
+    return _compile_patterns(NAME_CATEGORY_PATTERNS)
+
+
+# Name/slug patterns for utility (template, sample, demo, etc.)
+@cache
+def name_utility_re() -> re.Pattern:
+    return re.compile(r'template|sample|demo|starter|scaffold|boilerplate|hello.?world')
+
+
 # Special: business/commerce agents from Lifie.ai hub get "enterprise"
 def is_lifie_business_agent(agent: dict) -> bool:
     provider = agent.get("provider", {})
@@ -348,85 +556,67 @@ def is_lifie_business_agent(agent: dict) -> bool:
     ) and ("business" in tags or "commerce" in tags)
 
 
-def infer_category(agent: dict) -> str | None:
-    """Infer category from available signals. Returns None if not confident."""
-    candidates = Counter()
+def infer_category(
+    agent: dict,
+    tags: frozenset[str],
+    name_slug_lc: str,
+    desc_hits: list[int],
+) -> str | None:
+    """Infer category from available signals. Returns None if not confident.
 
-    tags = set(t.lower() for t in agent.get("tags", []))
-    desc = agent.get("description", "")
-    name = agent.get("name", "").lower()
-    slug = agent.get("slug", "").lower()
+    tags is the agent's lowercased tags, name_slug_lc the lowercased name and
+    slug, and desc_hits the DESC_CATEGORY_PATTERNS indices matching the
+    lowercased description.
+    """
+    candidates: dict[str, int] = {}
 
     # Special case: Lifie.ai business agents → enterprise
     if is_lifie_business_agent(agent):
         return "enterprise"
 
     # 1. Tag-based rules (strong signal, weight=3)
-    for tag_set, category, min_matches in TAG_CATEGORY_RULES:
-        matches = len(tags & tag_set)
-        if matches >= min_matches:
-            candidates[category] += 3 * matches
+    for category, matches in match_tag_rules(tags):
+        candidates[category] = candidates.get(category, 0) + 3 * matches
 
     # 2. Description patterns (medium signal, weight=2)
-    for pattern, category in DESC_CATEGORY_PATTERNS:
-        if re.search(pattern, desc, re.IGNORECASE):
-            candidates[category] += 2
+    for i in desc_hits:
+        category = DESC_CATEGORY_PATTERNS[i][1]
+        candidates[category] = candidates.get(category, 0) + 2
 
     # 3. Skill tags (medium signal, weight=2)
     for skill in agent.get("skills", []):
-        skill_tags = set(t.lower() for t in skill.get("tags", []))
-        for tag_set, category, min_matches in TAG_CATEGORY_RULES:
-            matches = len(skill_tags & tag_set)
-            if matches >= min_matches:
-                candidates[category] += 2
+        skill_tags = frozenset(t.lower() for t in skill.get("tags", []))
+        for category, _matches in match_tag_rules(skill_tags):
+            candidates[category] = candidates.get(category, 0) + 2
 
     # 4. Name/slug patterns (weak signal, weight=1)
-    combined = f"{name} {slug}"
-    if re.search(r'search|retriev|rag', combined):
-        candidates["search"] += 1
-    if re.search(r'secur|auth', combined):
-        candidates["security"] += 1
-    if re.search(r'financ|bank|trade|crypto', combined):
-        candidates["finance"] += 1
-    if re.search(r'travel|flight|hotel|trip', combined):
-        candidates["travel"] += 1
-    if re.search(r'media|image|video|audio', combined):
-        candidates["media-content"] += 1
-    if re.search(r'code|coding|dev', combined):
-        candidates["code-generation"] += 1
-    if re.search(r'data|analy', combined):
-        candidates["data-analytics"] += 1
-    if re.search(r'chat|convers', combined):
-        candidates["conversational"] += 1
-    if re.search(r'orchestrat|multi.?agent', combined):
-        candidates["orchestration"] += 1
-    if re.search(r'deploy|infra|devops|docker|k8s', combined):
-        candidates["infrastructure"] += 1
+    for pattern, category in name_category_patterns():
+        if pattern.search(name_slug_lc):
+            candidates[category] = candidates.get(category, 0) + 1
 
     # For "official-sample" tagged agents, they're typically "utility" (sample/demo)
     if "official-sample" in tags:
-        candidates["utility"] += 2
+        candidates["utility"] = candidates.get("utility", 0) + 2
 
     # Name/slug patterns for utility (template, sample, demo, etc.)
-    if re.search(r'template|sample|demo|starter|scaffold|boilerplate|hello.?world', combined):
-        candidates["utility"] += 2
+    if name_utility_re().search(name_slug_lc):
+        candidates["utility"] = candidates.get("utility", 0) + 2
 
-    if not candidates:
-        return None
+    best, best_score, _runner_up_score = top_candidates(candidates)
 
     # Need minimum score of 2
-    top = candidates.most_common(1)[0]
-    if top[1] < 2:
+    if best_score < 2:
         return None
 
-    return top[0]
+    return best
 
 
 # ============================================================
 # Framework inference
 # ============================================================
 
-# Patterns to detect frameworks from description, tags, name, repo
+# Patterns to detect frameworks from description, tags, name, repo.
+# Matched against lowercased text, so they're written in lowercase.
 FRAMEWORK_DETECTION = [
     # (patterns to search in text, framework name)
     (r'\b(?:google[- ]?adk|agent[- ]?development[- ]?kit)\b', "google-adk"),
@@ -453,6 +643,17 @@ FRAMEWORK_DETECTION = [
     (r'\bstrands[- ]?agents?\b', "strands-agents"),
 ]
 
+
+@cache
+def framework_patterns() -> list[tuple[re.Pattern, str]]:
+    return _compile_patterns(FRAMEWORK_DETECTION)
+
+
+@cache
+def _framework_db():
+    return _compile_hyperscan(framework_patterns())
+
+
 # Tags that directly indicate framework
 TAG_TO_FRAMEWORK = {
     "adk": "google-adk",
@@ -486,64 +687,243 @@ TAG_TO_FRAMEWORK = {
 }
 
 
-def infer_framework(agent: dict) -> str | None:
-    """Infer framework from available signals. Returns None if not confident."""
-    candidates = Counter()
+def infer_framework(agent: dict, tag_frameworks: list[str], all_text_lc: str) -> str | None:
+    """Infer framework from available signals. Returns None if not confident.
 
-    tags = agent.get("tags", [])
-    desc = agent.get("description", "")
-    name = agent.get("name", "")
-    slug = agent.get("slug", "")
-    repo = agent.get("repository", "")
+    tag_frameworks holds the TAG_TO_FRAMEWORK value of each matching tag and
+    all_text_lc the agent's name, slug, description and repository joined
+    together and lowercased.
+    """
+    candidates: dict[str, int] = {}
 
-    # Combine all text sources
-    all_text = f"{name} {slug} {desc} {repo}"
+    desc = agent.get("description", "")
 
     # 1. Tag-based (strong signal, weight=3)
-    for tag in tags:
-        tag_lower = tag.lower()
-        if tag_lower in TAG_TO_FRAMEWORK:
-            candidates[TAG_TO_FRAMEWORK[tag_lower]] += 3
+    for framework in tag_frameworks:
+        candidates[framework] = candidates.get(framework, 0) + 3
 
     # 2. Text-based patterns in description/name/slug/repo (medium signal, weight=2)
-    for pattern, framework in FRAMEWORK_DETECTION:
-        if re.search(pattern, all_text, re.IGNORECASE):
-            candidates[framework] += 2
+    for i in match_battery(framework_patterns(), _framework_db(), all_text_lc):
+        framework = FRAMEWORK_DETECTION[i][1]
+        candidates[framework] = candidates.get(framework, 0) + 2
 
     # 3. Official sample description parsing
     if "Official A2A" in desc:
         # e.g., "Official A2A python sample agent: Crewai"
         sample_name = desc.split(":")[-1].strip().lower() if ":" in desc else ""
-        for pattern, framework in FRAMEWORK_DETECTION:
-            if re.search(pattern, sample_name, re.IGNORECASE):
-                candidates[framework] += 4
+        for i in match_battery(framework_patterns(), _framework_db(), sample_name):
+            framework = FRAMEWORK_DETECTION[i][1]
+            candidates[framework] = candidates.get(framework, 0) + 4
 
-    if not candidates:
-        return None
+    best, best_score, _runner_up_score = top_candidates(candidates)
 
     # Need minimum score of 2
-    top = candidates.most_common(1)[0]
-    if top[1] < 2:
+    if best_score < 2:
         return None
 
     # Handle ambiguity: "adk" alone is weak, need at least 4 for google-adk
     # unless explicitly tagged
-    if top[0] == "google-adk" and top[1] < 3:
-        # Check if there's a stronger "adk" signal
-        has_adk_tag = any(t.lower() in ("adk", "adk-google", "adk-python", "google-adk") for t in tags)
+    if best == "google-adk" and best_score < 3:
+        # Check if there's a stronger "adk" signal (all adk tags map to google-adk)
+        has_adk_tag = "google-adk" in tag_frameworks
         if not has_adk_tag:
             return None
 
-    return top[0]
+    return best
 
 
 # ============================================================
 # Main enrichment logic
 # ============================================================
 
+def load_agent(data: bytes) -> dict:
+    """Parse an agent JSON document."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_agent(agent: dict) -> bytes:
+    """Serialize an agent the way the data files are stored (2-space indent, trailing newline)."""
+    if orjson is not None:
+        return orjson.dumps(agent, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(agent, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def write_agent(filepath: str, data: bytes):
+    """Overwrite an agent file with already-serialized bytes, bypassing Python's buffered IO."""
+    fd = os.open(filepath, os.O_WRONLY | os.O_TRUNC | os.O_CREAT, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+# Agent fields the infer_* functions read; a change to any of them invalidates a cache entry
+CACHE_KEY_FIELDS = ("name", "slug", "description", "repository", "framework", "tags", "sdks", "skills", "provider")
+
+
+def load_cache() -> dict[str, dict[str, str | None]]:
+    """Load cached inference results, or an empty cache if missing or stale."""
+    try:
+        data = json.loads(CACHE_FILE.read_bytes())
+    except (FileNotFoundError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return {}
+    entries = data.get("entries")
+    if not isinstance(entries, dict):
+        return {}
+    return entries
+
+
+def save_cache(entries: dict[str, dict[str, str | None]]):
+    CACHE_FILE.write_text(
+        json.dumps({"version": CACHE_VERSION, "entries": entries}, sort_keys=True) + "\n",
+        encoding="utf-8",
+    )
+
+
+def cache_key(agent: dict) -> str:
+    """Hash the inference inputs of an agent."""
+    inputs = {field: agent.get(field) for field in CACHE_KEY_FIELDS}
+    canonical = json.dumps(inputs, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def _analyze(agent: dict, fields: set[str]) -> dict[str, str | None]:
+    """Infer the requested fields ("language", "category", "framework") of an agent.
+
+    Tags are walked once for all three tag tables and the description is
+    lowercased once for the case-insensitive batteries, then each field is
+    scored.
+    """
+    tags_lower = []
+    tag_languages = []
+    tag_frameworks = []
+    for tag in agent.get("tags", []):
+        tag = tag.lower()
+        tags_lower.append(tag)
+        if tag in TAG_TO_LANGUAGE:
+            tag_languages.append(TAG_TO_LANGUAGE[tag])
+        if tag in TAG_TO_FRAMEWORK:
+            tag_frameworks.append(TAG_TO_FRAMEWORK[tag])
+    tags = frozenset(tags_lower)
+
+    # Plain concatenation is cheaper than f-string formatting; lowercase once
+    name = agent.get("name", "")
+    slug = agent.get("slug", "")
+    desc = agent.get("description", "")
+    desc_lc = desc.lower()
+    slug_name_lc = (slug + " " + name).lower()
+    # Category and framework patterns read name first; the joining space
+    # matters for patterns like hello.?world that can span it
+    name_slug_lc = name.lower() + " " + slug.lower()
+
+    results = {}
+    if "language" in fields:
+        # Language patterns are case-sensitive, so they scan the original text
+        scan_desc = partial(match_battery, desc_language_patterns(), _desc_language_db(), desc)
+        results["language"] = infer_language(agent, tag_languages, slug_name_lc, scan_desc)
+    if "category" in fields:
+        desc_category_hits = match_battery(desc_category_patterns(), _desc_category_db(), desc_lc)
+        results["category"] = infer_category(agent, tags, name_slug_lc, desc_category_hits)
+    if "framework" in fields:
+        all_text_lc = name_slug_lc + " " + desc_lc + " " + agent.get("repository", "").lower()
+        results["framework"] = infer_framework(agent, tag_frameworks, all_text_lc)
+    return results
+
+
+# Enriched fields and the placeholder value that marks them for inference
+ENRICHED_FIELDS = (("language", "unknown"), ("category", "general"), ("framework", "custom"))
+
+# Stats counter for fields that were left untouched because inference wasn't confident
+UNRESOLVED_STATS = {
+    "language": "language_still_unknown",
+    "category": "category_still_general",
+    "framework": "framework_still_custom",
+}
+
+# Placeholder values the enrichment replaces, as they appear in the raw JSON
+ENRICHABLE_SENTINELS = (b'"unknown"', b'"general"', b'"custom"')
+
+
+def _process_one(
+    filepath: str,
+    inference_cache: dict[str, dict[str, str | None]],
+) -> tuple[
+    str, dict | None, bool, list[tuple[str, str, str | None]], bytes | None,
+    tuple[str, dict[str, str | None]] | None,
+]:
+    """Read and enrich a single agent file without writing to disk or mutating shared state.
+
+    Returns (filepath, agent, modified, changes, output, cache_entry), where
+    each change is (field, old value, new value) and a new value of None means
+    inference wasn't confident enough to change the field. output holds the
+    serialized agent only when it differs from the bytes on disk, and
+    cache_entry is the (key, results) pair to keep for the next run. agent is
+    None when the file holds no placeholder values and was skipped without
+    parsing. inference_cache is only read.
+    """
+    data = Path(filepath).read_bytes()
+    if not any(sentinel in data for sentinel in ENRICHABLE_SENTINELS):
+        return filepath, None, False, [], None, None
+
+    agent = load_agent(data)
+    key = cache_key(agent)
+    entry = dict(inference_cache.get(key, {}))
+    missing = {
+        field for field, placeholder in ENRICHED_FIELDS
+        if agent.get(field) == placeholder and field not in entry
+    }
+    if missing:
+        entry.update(_analyze(agent, missing))
+
+    modified = False
+    changes = []
+
+    # 1. Enrich language
+    if agent.get("language") == "unknown":
+        new_lang = entry["language"]
+        changes.append(("language", agent["language"], new_lang))
+        if new_lang:
+            agent["language"] = new_lang
+            modified = True
+
+    # 2. Enrich category
+    if agent.get("category") == "general":
+        new_cat = entry["category"]
+        changes.append(("category", agent["category"], new_cat))
+        if new_cat:
+            agent["category"] = new_cat
+            modified = True
+
+    # 3. Enrich framework
+    if agent.get("framework") == "custom":
+        new_fw = entry["framework"]
+        changes.append(("framework", agent["framework"], new_fw))
+        if new_fw:
+            agent["framework"] = new_fw
+            modified = True
+
+    # Serialize here so the main thread only writes files that really changed
+    output = None
+    if modified:
+        output = dump_agent(agent)
+        if output == data:
+            output = None
+
+    return filepath, agent, modified, changes, output, (key, entry)
+
+
 def enrich_agents():
     """Read all agent JSON files, enrich, and write back."""
-    files = sorted(glob.glob(str(AGENTS_DIR / "*.json")))
+    files = sorted(
+        entry.path for entry in os.scandir(AGENTS_DIR)
+        if entry.name.endswith(".json") and entry.is_file()
+    )
     print(f"Found {len(files)} agent files\n")
 
     stats = {
@@ -560,62 +940,43 @@ def enrich_agents():
     }
 
     changes_log = []
-
-    for filepath in files:
-        with open(filepath, "r", encoding="utf-8") as f:
-            agent = json.load(f)
-
-        modified = False
-        slug = agent.get("slug", os.path.basename(filepath))
-        file_changes = []
-
-        # 1. Enrich language
-        if agent.get("language") == "unknown":
-            new_lang = infer_language(agent)
-            if new_lang:
-                old = agent["language"]
-                agent["language"] = new_lang
-                modified = True
-                stats["language_changed"] += 1
-                stats["language_details"][new_lang] += 1
-                file_changes.append(f"  language: {old} -> {new_lang}")
-            else:
-                stats["language_still_unknown"] += 1
-
-        # 2. Enrich category
-        if agent.get("category") == "general":
-            new_cat = infer_category(agent)
-            if new_cat:
-                old = agent["category"]
-                agent["category"] = new_cat
-                modified = True
-                stats["category_changed"] += 1
-                stats["category_details"][new_cat] += 1
-                file_changes.append(f"  category: {old} -> {new_cat}")
-            else:
-                stats["category_still_general"] += 1
-
-        # 3. Enrich framework
-        if agent.get("framework") == "custom":
-            new_fw = infer_framework(agent)
-            if new_fw:
-                old = agent["framework"]
-                agent["framework"] = new_fw
-                modified = True
-                stats["framework_changed"] += 1
-                stats["framework_details"][new_fw] += 1
-                file_changes.append(f"  framework: {old} -> {new_fw}")
-            else:
-                stats["framework_still_custom"] += 1
-
-        # Write back if modified
-        if modified:
-            stats["files_modified"] += 1
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(agent, f, indent=2, ensure_ascii=False)
-                f.write("\n")
-            changes_log.append(f"{slug}:")
-            changes_log.extend(file_changes)
+    inference_cache = load_cache()
+    # Only entries for agents seen this run are kept, so the cache can't grow stale
+    next_cache = {}
+
+    # Reading and inference overlap across files; stats and writes stay on this thread
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(partial(_process_one, inference_cache=inference_cache), files)
+        for filepath, agent, modified, changes, output, cache_entry in results:
+            file_changes = []
+            if cache_entry is not None:
+                key, entry = cache_entry
+                next_cache[key] = entry
+
+            for field, old, new in changes:
+                if new:
+                    stats[f"{field}_changed"] += 1
+                    stats[f"{field}_details"][new] += 1
+                    file_changes.append(f"  {field}: {old} -> {new}")
+                else:
+                    stats[UNRESOLVED_STATS[field]] += 1
+
+            # Write back if modified (and the serialized bytes actually differ)
+            if modified:
+                slug = agent.get("slug", os.path.basename(filepath))
+                stats["files_modified"] += 1
+                if output is not None:
+                    write_agent(filepath, output)
+                changes_log.append(f"{slug}:")
+                changes_log.extend(file_changes)
+
+    # The cache is only a speedup; a read-only checkout shouldn't fail the run
+    if next_cache != inference_cache:
+        try:
+            save_cache(next_cache)
+        except OSError as e:
+            print(f"Warning: could not write {CACHE_FILE}: {e}", file=sys.stderr)
 
     # Print detailed changes
     print("=" * 60)